@@ -1,8 +1,70 @@
+import atexit
+import io
 import logging
+import logging.handlers
+import queue
+import sys
 import colorlog
-from typing import Literal
+from types import MappingProxyType
+from typing import ClassVar, Literal, Mapping
 
 
+class BufferedStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler writing to stderr through a large buffer, batching many records into a
+    single write. The buffer is flushed for WARNING and above, or when explicitly flushed
+    (see FlushingQueueListener).
+    """
+    def __init__(self, buffer_size: int = 65536):
+        try:
+            raw = open(sys.stderr.fileno(), "wb", buffering=buffer_size, closefd=False)
+            stream = io.TextIOWrapper(raw, encoding=sys.stderr.encoding, errors="backslashreplace", write_through=False)
+        except (AttributeError, ValueError, io.UnsupportedOperation):
+            # stderr has been replaced by something without a file descriptor
+            stream = None
+        super().__init__(stream)
+
+    def emit(self, record):
+        try:
+            msg = self.format(record)
+            self.stream.write(msg + self.terminator)
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that flushes its handlers once it has drained the queue, so a burst of records
+    is still written in one go, but nothing waits in a buffer while the logger is idle.
+    """
+    def handle(self, record):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+class CachedColoredFormatter(colorlog.ColoredFormatter):
+    """
+    ColoredFormatter that resolves the escape codes for each level once, instead of copying
+    the full escape code table and parsing the level's colors for every record. Whether to
+    color at all (NO_COLOR, FORCE_COLOR) is still decided per record.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._escape_codes: dict[str, dict[str, str]] = {}
+
+    def _escape_code_map(self, item: str) -> dict[str, str]:
+        if not self._colorize():
+            return super()._escape_code_map(item)
+        codes = self._escape_codes.get(item)
+        if codes is None:
+            codes = self._escape_codes[item] = super()._escape_code_map(item)
+        return codes
 
 
 class Logger:
@@ -19,8 +81,28 @@ class Logger:
     :ivar log: The primary logger instance for handling logs.
     :type log: colorlog.RootLogger
     :ivar console: Handler for directing log messages to the console output.
-    :type console: logging.StreamHandler
+    :type console: BufferedStreamHandler
+    :ivar listener: Background listener draining queued records into the console handler.
+    :type listener: logging.handlers.QueueListener
     """
+    _PROFILES: ClassVar[Mapping[str, Mapping[str, str]]] = MappingProxyType({
+        "highvis": {
+            "DEBUG": "cyan",
+            "INFO": "light_green",
+            "WARNING": "light_yellow",
+            "ERROR": "light_red",
+            "CRITICAL": "light_red,bg_white"
+        },
+        "lowvis": {
+            "DEBUG": "cyan",
+            "INFO": "green",
+            "WARNING": "yellow",
+            "ERROR": "red",
+            "CRITICAL": "red,bg_white"
+        }
+    })
+    _instances: ClassVar[dict[str, "Logger"]] = {}
+
     def __init__(self, name:str, profile:str="lowvis", loglevel: Literal["DEBUG", "INFO", "WARNING", "ERROR"]="DEBUG"):
         """
         Represents a logger object that initializes a logging instance with customized
@@ -34,50 +116,78 @@ class Logger:
         :type loglevel: Literal["DEBUG", "INFO", "WARNING", "ERROR"], optional
         """
         self.log = colorlog.getLogger(name)
-        self.log.setLevel("DEBUG")
+        self.console = None
+        self.listener = None
+        if self.log.handlers:
+            # Already configured by another Logger, adding handlers again would duplicate every record
+            return
+        # Gate on the logger itself, so filtered records are never created or formatted
+        self.log.setLevel(loglevel)
 
         # Let's create our handlers
-        self.console = logging.StreamHandler()
+        self.console = BufferedStreamHandler()
         self.console.setLevel(loglevel)
-        log_format = colorlog.ColoredFormatter(
+        log_format = CachedColoredFormatter(
             fmt="{log_color}{asctime} - {name:10s} - {levelname:10s} - {message}",
             style="{",
             datefmt="%H:%M:%S",
             log_colors=self.get_profile(profile),
         )
         self.console.setFormatter(log_format)
-        self.log.addHandler(self.console)
+
+        # Records are queued by the caller and written by a single background listener
+        self._q = queue.SimpleQueue()
+        self.listener = FlushingQueueListener(self._q, self.console, respect_handler_level=True)
+        self.listener.start()
+        self._queue_handler = logging.handlers.QueueHandler(self._q)
+        self.log.addHandler(self._queue_handler)
+        atexit.register(self.close)
+
+    @classmethod
+    def get(cls, name: str, profile: str = "lowvis", loglevel: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "DEBUG") -> "Logger":
+        """
+        Returns the shared Logger for the given name, creating it on first use. Profile and
+        loglevel only apply when the Logger is created.
+
+        :param name: Name of the logger instance, used for labeling log messages.
+        :type name: str
+        :param profile: The color profile that determines log color formatting. Default is "lowvis".
+        :type profile: str, optional
+        :param loglevel: Minimum log level for console messages. Default is "DEBUG".
+        :type loglevel: Literal["DEBUG", "INFO", "WARNING", "ERROR"], optional
+        :return: The cached Logger instance.
+        :rtype: Logger
+        """
+        if name not in cls._instances:
+            cls._instances[name] = cls(name, profile=profile, loglevel=loglevel)
+        return cls._instances[name]
+
+    def close(self):
+        """Stop the background listener and flush any queued or buffered records"""
+        if self.listener is not None:
+            # Detach first, so a later Logger.get() for this name builds a working Logger
+            self.log.removeHandler(self._queue_handler)
+            if self._instances.get(self.log.name) is self:
+                del self._instances[self.log.name]
+            self.listener.stop()
+            self.listener = None
+        if self.console is not None:
+            self.console.flush()
 
     def format(self, record):
         log_fmt = self.FORMATS.get(record.levelno)
         formatter = logging.Formatter(log_fmt)
         return formatter.format(record)
-    def warning(self, msg):
-        self.log.warning(msg)
-    def info(self, msg):
-        self.log.info(msg)
-    def debug(self, msg):
-        self.log.debug(msg)
-    def error(self, msg):
-        self.log.error(msg)
+    def warning(self, msg, *args):
+        self.log.warning(msg, *args)
+    def info(self, msg, *args):
+        self.log.info(msg, *args)
+    def debug(self, msg, *args):
+        self.log.debug(msg, *args)
+    def error(self, msg, *args):
+        self.log.error(msg, *args)
     def get_profile(self, profile):
-        profiles = {
-            "highvis": {
-                "DEBUG": "cyan",
-                "INFO": "light_green",
-                "WARNING": "light_yellow",
-                "ERROR": "light_red",
-                "CRITICAL": "light_red,bg_white"
-            },
-            "lowvis": {
-                "DEBUG": "cyan",
-                "INFO": "green",
-                "WARNING": "yellow",
-                "ERROR": "red",
-                "CRITICAL": "red,bg_white"
-            }
-        }
-        return profiles[profile]
+        return self._PROFILES[profile]
 
 
 
@@ -3,12 +3,9 @@ import shutil
 import socket
 import queue
 import threading
-import time
 from typing import Tuple, Callable, Optional
 from logger import Logger
-import re
 
-is_max_prompt = re.compile(r"(%i1)")
 
 class MaximaServer:
     def __init__(self,
@@ -18,13 +15,14 @@ class MaximaServer:
                  handler: Optional[Callable[[str], str]] = None
     ):
 
-        self.log = Logger("MaximaServer")
+        self.log = Logger.get("MaximaServer")
 
         #Socket Server settings
         self.port_range = port_range
         self.host = host
-        self.server_socket: Optional[socket.socket] = None
-        self.server_thread: Optional[threading.Thread] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
         self.server_running = False
         self.handler = handler or self._default_handler
         self.port = None
@@ -33,6 +31,8 @@ class MaximaServer:
         self.maxima_path = maxima_path
         self.maxima_instance = None
         self.maxima_status = None
+        self._ready = threading.Event()
+        self._stdout_task: Optional[asyncio.Task] = None
         self.maxima_info = {
             "pid": None,
             "version": "N/A",
@@ -41,12 +41,10 @@ class MaximaServer:
         self._valid_maxima_path()
 
         #Communication Queue
-        self.send_queue = queue.Queue()
-        self.response_queue = queue.Queue()
-        self._clients: list[threading.Thread] = []
+        self.response_queue = queue.SimpleQueue()
 
     def _default_handler(self, command: str) -> str:
-        """Override this or pass a handler to __init__"""
+        """Override this or pass a handler to __init__, handlers run in a worker thread"""
         return f"Received: {command}"
 
     def _valid_maxima_path(self):
@@ -60,105 +58,98 @@ class MaximaServer:
 
         :raises FileNotFoundError: If the Maxima executable cannot be located at the specified path.
         """
-        if not shutil.which(self.maxima_path):
-            self.log.error(f"Maxima not found at {self.maxima_path}")
+        resolved = shutil.which(self.maxima_path)
+        if not resolved:
+            self.log.error("Maxima not found at %s", self.maxima_path)
             raise FileNotFoundError(f"Maxima not found at specified path. {self.maxima_path}")
-        else:
-            self.maxima_path = shutil.which(self.maxima_path)
-            self.log.info(f"Maxima found at {self.maxima_path}")
+        self.maxima_path = resolved
+        self.log.info("Maxima found at %s", self.maxima_path)
 
     def _select_free_port(self, port_range, host):
         """
-        Selects a free port within the specified range on the given host. If the port range contains
-        only a single port, it checks the availability of that port. If the range contains two ports,
-        it iterates through all ports in the range and selects the first available port. If no free
-        ports are available within the range, the method logs an error and exits the program.
-
-        :param port_range: The port range specified. Can be a single integer or a tuple of two integers
-            representing the lower and upper bounds of the range (inclusive).
-        :type port_range: Union[int, Tuple[int, int]]
+        Selects a free port within the specified range on the given host. If no port range is given
+        (None or 0), the operating system picks a free ephemeral port with a single bind. If the port
+        range contains only a single port, it checks the availability of that port. If the range
+        contains two ports, it iterates through all ports in the range, reusing one socket, and selects
+        the first available port. If no free ports are available within the range, the method logs an
+        error and exits the program.
+
+        :param port_range: The port range specified. Can be None or 0 for any free port, a single
+            integer or a tuple of two integers representing the lower and upper bounds of the range
+            (inclusive).
+        :type port_range: Union[None, int, Tuple[int, int]]
         :param host: The name of the host on which to look for an available port.
         :type host: str
         :return: The first free port found in the range, or logs an error and exits the program if no
             free ports are found.
         :rtype: int
         """
-        if isinstance(port_range, int):
+        if not port_range:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.bind((host, 0))
+                return s.getsockname()[1]
+        elif isinstance(port_range, int):
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                 try:
                     s.bind((host, port_range))
                     return port_range
                 except OSError:
-                    self.log.error(f"Port {port_range[0]} is already in use")
+                    self.log.error("Port %s is already in use", port_range)
                     exit(2)
         elif len(port_range) != 2:
             self.log.error("Invalid port range, need a start and a end port range")
             exit(2)
         elif isinstance(port_range[0], int) and isinstance(port_range[1], int):
-            for port in range(port_range[0], port_range[1]):
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            # A failed bind leaves the socket unbound, so one socket serves the whole scan
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                for port in range(port_range[0], port_range[1]):
                     try:
                         s.bind((host, port))
                         return port
                     except OSError:
                         continue
-            self.log.error(f"No free ports found in range: {port_range[0]}-{port_range[1]}")
+            self.log.error("No free ports found in range: %s-%s", port_range[0], port_range[1])
             exit(2)
         else:
             self.log.error("Invalid port range, need a numerical start and a end port range")
             exit(2)
 
-    def _handle_client(self, client_socket: socket.socket, address: tuple):
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         """Handle a single client connection"""
-        self.log.info(f"Connection from {address}")
-        client_socket.settimeout(1.0)
+        address = writer.get_extra_info("peername")
+        self.log.info("Connection from %s", address)
 
-        while self.server_running:
-            try:
-                data = client_socket.recv(4096)
-                if not data:
+        try:
+            while self.server_running:
+                try:
+                    data = await reader.read(65536)
+                    if not data:
+                        break
+                    command = data.decode('utf-8', errors='replace').strip()
+                    self.log.debug("Received: %s", command)
+                    # Handlers are user code and may block, keep them off the event loop
+                    response = await asyncio.to_thread(self.handler, command)
+                    if response.startswith("%i1"):
+                        self._ready.set()
+
+                    # Store in queue for main thread to pick up
+                    self.response_queue.put({
+                        'address': address,
+                        'command': command,
+                        'response': response
+                    })
+
+                    # Send response back to client
+                    # writer.write(response.encode('utf-8'))
+                    # await writer.drain()
+
+                except (ConnectionResetError, BrokenPipeError):
                     break
-                self.log.debug(f"Received: {data.decode('utf-8').strip()}")
-                package = data.decode('utf-8').strip()
-
-
-                command = data.decode('utf-8').strip()
-                response = self.handler(command)
-
-                # Store in queue for main thread to pick up
-                self.response_queue.put({
-                    'address': address,
-                    'command': command,
-                    'response': response
-                })
-
-                # Send response back to client
-                # client_socket.send(response.encode('utf-8'))
-
-            except socket.timeout:
-                continue
-            except (ConnectionResetError, BrokenPipeError):
-                break
-
-        client_socket.close()
-        print(f"Connection closed: {address}")
-
-    def _accept_loop(self):
-        """Main loop accepting new connections"""
-        while self.server_running:
-            try:
-                client_socket, address = self.server_socket.accept()
-                client_thread = threading.Thread(
-                    target=self._handle_client,
-                    args=(client_socket, address),
-                    daemon=True
-                )
-                client_thread.start()
-                self._clients.append(client_thread)
-            except socket.timeout:
-                continue
-            except OSError:
-                break
+        finally:
+            # Also runs when stop() cancels this task, so the connection is never left open
+            writer.close()
+            await writer.wait_closed()
+            print(f"Connection closed: {address}")
 
     def get_response(self, block: bool = False, timeout: Optional[float] = None) -> Optional[dict]:
         """
@@ -177,68 +168,103 @@ class MaximaServer:
         """Get all pending responses without blocking"""
         results = []
         while True:
-            item = self.get_response(block=False)
-            if item is None:
-                break
-            results.append(item)
-        return results
+            try:
+                results.append(self.response_queue.get_nowait())
+            except queue.Empty:
+                return results
 
     def stop(self):
-        """Stop the server"""
+        """Stop the server and the Maxima instance, then close the event loop"""
         self.server_running = False
-        if self.server_socket:
-            self.server_socket.close()
-        if self._server_thread:
-            self._server_thread.join(timeout=2.0)
+        if self._loop and self._loop.is_running():
+            try:
+                self._run_coroutine(self._shutdown(), timeout=2.0)
+            except TimeoutError:
+                self.log.warning("Timed out waiting for the server to shut down")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._loop_thread:
+            self._loop_thread.join(timeout=2.0)
+            if not self._loop_thread.is_alive():
+                self._loop.close()
         print("Server stopped")
 
-    def _create_server_socket(self):
-        self.port = self._select_free_port(self.port_range, self.host)
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(5)
-        self.server_socket.settimeout(1.0)  # Allow checking self.running periodically
+    async def _shutdown(self):
+        """Terminate Maxima and drain its stdout, cancel the remaining tasks, then close the server"""
+        if self.maxima_instance and self.maxima_instance.returncode is None:
+            self.maxima_instance.terminate()
+            try:
+                await asyncio.wait_for(self.maxima_instance.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                self.log.warning("Maxima ignored SIGTERM, killing it")
+                self.maxima_instance.kill()
+                await self.maxima_instance.wait()
+        if self._stdout_task:
+            # Maxima has exited, so its stdout is at EOF; let the pump log what is left
+            try:
+                await asyncio.wait_for(self._stdout_task, timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+            self._stdout_task = None
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _serve(self):
+        """Start the asyncio socket server, all clients are multiplexed on the event loop"""
+        self.server = await asyncio.start_server(
+            self._handle_client, self.host, self.port,
+            backlog=1024,
+        )
         self.server_running = True
+        self.log.info("Socket Server started on %s:%s", self.host, self.port)
 
-        self._server_thread = threading.Thread(target=self._accept_loop, daemon=True)
-        self._server_thread.start()
-        self.log.info(f"Socket Server started on {self.host}:{self.port}")
+    def _start_event_loop(self):
+        """Run one event loop in the background, shared by the socket server and the Maxima process"""
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
 
+    def _run_coroutine(self, coro, timeout: Optional[float] = 10.0):
+        """Run a coroutine on the shared event loop and wait up to timeout seconds for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout=timeout)
 
     async def _start_maxima_instance(self, maxima_path: str):
-        self.maxima_instance = await asyncio.create_subprocess_shell(f"{maxima_path} -s {self.port}", stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        self.maxima_instance = await asyncio.create_subprocess_exec(maxima_path, "-s", str(self.port), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        self._stdout_task = asyncio.create_task(self._pump_stdout(self.maxima_instance.stdout))
+
+    async def _pump_stdout(self, stdout: asyncio.StreamReader):
+        """Log Maxima's stdout, the session itself, prompt included, runs over the socket"""
+        while line := await stdout.readline():
+            self.log.debug("Maxima: %s", line.decode('utf-8', errors='replace').strip())
 
 
 
     def start_instance(self):
-        self.log.info(f"Starting Server Socket for Maxima at {self.host}")
-        self._create_server_socket()
-        self.log.info(f"Maxima initiated, connect to  {self.host}:{self.port}")
-        asyncio.run(self._start_maxima_instance(self.maxima_path))
+        self.log.info("Starting Server Socket for Maxima at %s", self.host)
+        # Port selection may exit(2), which must happen on the caller's thread, not the loop's
+        self.port = self._select_free_port(self.port_range, self.host)
+        self._ready.clear()
+        self._start_event_loop()
+        try:
+            self._run_coroutine(self._serve())
+            self.log.info("Maxima initiated, connect to  %s:%s", self.host, self.port)
+            self._run_coroutine(self._start_maxima_instance(self.maxima_path))
+        except BaseException:
+            # Don't leave the loop thread running or the port bound when startup fails
+            self.stop()
+            raise
         self.log.info("Confirming connection with Maxima")
         self.maxima_status = "INIT"
-        wait_time = 0
-        while self.maxima_status != "READY":
-            time.sleep(1)
-            response = self.get_response(block=True, timeout=1)
-            if response is not None:
-                self.log.debug(response['response'])
-
-                if is_max_prompt.match(response['response']):
-                    self.log.info("Maxima is ready for input")
-                    self.maxima_status = "READY"
-
-            else:
-                self.log.debug("No response from Maxima")
-            wait_time += 1
-            if wait_time > 10:
-                self.log.error("Maxima did not respond in time, exiting")
-                exit(2)
-
-
-
-
+        if not self._ready.wait(timeout=10):
+            self.log.error("Maxima did not respond in time, exiting")
+            self.stop()
+            exit(2)
+        self.log.info("Maxima is ready for input")
+        self.maxima_status = "READY"
 
 
 if __name__ == "__main__":